@@ -8,11 +8,18 @@ from scipy.io.wavfile import write
 from datetime import datetime
 import pandas as pda
 import google.generativeai as genai
-import base64
+try:
+    # SIMD-accelerated drop-in replacement; a multi-MB WAV encode is the
+    # hottest pre-RPC CPU on the transcription path
+    import pybase64 as base64
+except ImportError:
+    import base64
 import pyaudio
 import wave
 import json
 import re
+
+_DECODER = json.JSONDecoder()
 load_dotenv()
 
 app = Flask(__name__, static_folder='temp', static_url_path='')
@@ -229,11 +236,12 @@ def generate_structured_medical_summary(model, translation):
         response = model.generate_content(prompt)
         response_text = response.text.strip()
         json_start = response_text.find('{')
-        json_end = response_text.rfind('}')
         
-        if json_start >= 0 and json_end >= 0:
-            json_str = response_text[json_start:json_end+1]
-            summary_data = json.loads(json_str)
+        if json_start >= 0:
+            # raw_decode stops at the end of the first JSON object, so
+            # trailing prose after the payload is ignored without an
+            # rfind scan over the whole response
+            summary_data, _ = _DECODER.raw_decode(response_text[json_start:])
         else:
             summary_data = json.loads(response_text)
             
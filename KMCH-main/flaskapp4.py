@@ -1,15 +1,18 @@
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 import time
-from datetime import datetime
+import numpy as np
+from scipy.io.wavfile import write
+from datetime import datetime, timezone
 import google.generativeai as genai
-import base64
 import pyaudio
-import wave
 import json
-import re
+import gzip
+import secrets
+import atexit
+from threading import Lock
 from pymongo import MongoClient
 
 # -------------------- ENV --------------------
@@ -17,6 +20,9 @@ load_dotenv()
 
 # -------------------- APP --------------------
 app = Flask(__name__, static_folder='temp', static_url_path='')
+# Let a fronting Nginx/Apache sendfile(2) recordings instead of
+# streaming them through Python (no-op under the dev server)
+app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', '0') == '1'
 CORS(app)
 
 # -------------------- GEMINI --------------------
@@ -31,11 +37,50 @@ def initialize_gemini():
     model = gemini.GenerativeModel('models/gemini-2.5-flash')  # ✅ Updated model
     return model
 
+
+# Bound output size and keep decoding deterministic - without a cap the
+# model can free-run far past what the prompts need
+_GEN_CONFIG = {"temperature": 0.1, "max_output_tokens": 2048}
+
+# Prompts built once at import; the per-request text rides along as a
+# separate content part instead of being interpolated into a fresh
+# f-string on every call
+PROMPT_TRANSCRIBE = (
+    "Please transcribe this audio file with high accuracy. "
+    "This is a doctor making clinical notes about a patient."
+)
+
+PROMPT_TRANSLATE = (
+    "Translate the following medical transcription to English."
+)
+
+PROMPT_SUMMARY = """Create a structured medical summary in JSON.
+
+Format:
+{
+  "summary": "",
+  "medical_condition": "",
+  "treatment_plan": "",
+  "followup_date": ""
+}
+"""
+
 # -------------------- MONGODB --------------------
 mongo_uri = os.getenv("MONGO_URI")
 db_name = os.getenv("DB_NAME")
 
-mongo_client = MongoClient(mongo_uri)
+# One shared client for the whole process - tuned pool so concurrent
+# request threads don't queue on connections, wire compression so the
+# KB-sized transcript documents cost less bandwidth (falls back through
+# the list to whatever the server/driver supports)
+mongo_client = MongoClient(
+    mongo_uri,
+    maxPoolSize=200,
+    minPoolSize=10,
+    compressors='zstd,snappy,zlib',
+    retryWrites=True,
+    appname='kmch-flask'
+)
 mongo_db = mongo_client[db_name]
 
 patients_col = mongo_db["patients"]
@@ -43,41 +88,45 @@ records_col = mongo_db["records"]
 doctors_col = mongo_db["doctors"]
 
 # -------------------- AUDIO STREAMING STATE --------------------
-recording_state = {
-    "is_recording": False,
-    "audio_chunks": [],
-    "stream": None,
-    "p": None
-}
+# Per-session recording state keyed by a server-issued session id.
+# A single global dict meant concurrent users trampled each other's
+# streams; the lock guards mutations from parallel request threads.
+_sessions = {}
+_sessions_lock = Lock()
 
 # -------------------- AUDIO RECORD --------------------
+# Shared PortAudio handle - instantiating PyAudio per request costs tens
+# of ms of device enumeration; streams are still opened/closed per call
+_PA = pyaudio.PyAudio()
+atexit.register(_PA.terminate)
+
+
 def record_audio(duration=10, sample_rate=44100):
-    p = pyaudio.PyAudio()
-    stream = p.open(format=pyaudio.paInt16,
+    stream = _PA.open(format=pyaudio.paInt16,
                     channels=1,
                     rate=sample_rate,
                     input=True,
                     frames_per_buffer=1024)
 
-    frames = []
-    for _ in range(0, int(sample_rate / 1024 * duration)):
+    # Pre-sized int16 buffer - avoids building a list of byte chunks
+    # and the O(n) b''.join copy at the end
+    num_chunks = int(sample_rate / 1024 * duration)
+    buf = np.empty(num_chunks * 1024, dtype=np.int16)
+    idx = 0
+    for _ in range(num_chunks):
         data = stream.read(1024)
-        frames.append(data)
+        samples = np.frombuffer(data, dtype=np.int16)
+        buf[idx:idx + len(samples)] = samples
+        idx += len(samples)
         time.sleep(0.001)
 
     stream.stop_stream()
     stream.close()
-    p.terminate()
 
     filename = f"recordings/recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"
     os.makedirs(os.path.dirname(filename), exist_ok=True)
 
-    wf = wave.open(filename, 'wb')
-    wf.setnchannels(1)
-    wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-    wf.setframerate(sample_rate)
-    wf.writeframes(b''.join(frames))
-    wf.close()
+    write(filename, sample_rate, buf[:idx])
 
     return filename
 
@@ -86,55 +135,41 @@ def transcribe_and_translate(model, audio_file, source_language="auto"):
     with open(audio_file, "rb") as f:
         audio_data = f.read()
 
-    audio_b64 = base64.b64encode(audio_data).decode()
-
-    prompt_transcribe = f"""
-    Please transcribe this audio file with high accuracy. This is a doctor making clinical notes about a patient.
-    """
-
+    # Pass raw bytes - the SDK encodes on the wire, so base64-encoding here
+    # just adds an extra 1.33x string allocation. stream=True lets us
+    # collect text while the model is still decoding
     response = model.generate_content([
-        prompt_transcribe,
-        {"mime_type": "audio/wav", "data": audio_b64}
-    ])
+        PROMPT_TRANSCRIBE,
+        {"mime_type": "audio/wav", "data": audio_data}
+    ], generation_config=_GEN_CONFIG, stream=True)
 
-    transcript = response.text
+    transcript = "".join(chunk.text for chunk in response)
 
-    has_non_english = bool(re.search(r'[^\x00-\x7F]', transcript))
+    # str.isascii is a C-level byte scan - no regex engine entry and no
+    # match-object allocation. Pure-ASCII transcripts are already
+    # English clinical notes, so the translation round-trip (the most
+    # common case) is skipped entirely
+    has_non_english = not transcript.isascii()
+    if not has_non_english:
+        return transcript, transcript
 
-    prompt_translate = f"""
-    Translate the following medical transcription to English.
-    Text:
-    {transcript}
-    """
-
-    translation_response = model.generate_content(prompt_translate)
-    translation = translation_response.text
+    translation_response = model.generate_content(
+        [PROMPT_TRANSLATE, transcript],
+        generation_config=_GEN_CONFIG, stream=True)
+    translation = "".join(chunk.text for chunk in translation_response)
 
     return transcript, translation
 
 # -------------------- SUMMARY --------------------
 def generate_structured_medical_summary(model, translation):
-    prompt = f"""
-    Create a structured medical summary in JSON.
-    Text: {translation}
-    
-    Format:
-    {{
-      "summary": "",
-      "medical_condition": "",
-      "treatment_plan": "",
-      "followup_date": ""
-    }}
-    """
-
-    response = model.generate_content(prompt)
-    response_text = response.text.strip()
-
-    json_start = response_text.find('{')
-    json_end = response_text.rfind('}')
-
-    json_str = response_text[json_start:json_end+1]
-    summary_data = json.loads(json_str)
+    # Ask Gemini for pure JSON so we can parse directly instead of
+    # scanning the response twice for the outermost braces
+    response = model.generate_content(
+        [PROMPT_SUMMARY, translation],
+        generation_config=dict(_GEN_CONFIG,
+                               response_mime_type="application/json")
+    )
+    summary_data = json.loads(response.text)
 
     return summary_data
 
@@ -174,7 +209,11 @@ def record():
 @app.route('/save', methods=['POST'])
 def save():
     try:
-        data = request.get_json()
+        # The page gzips transcript-heavy bodies via CompressionStream
+        if request.headers.get('Content-Encoding') == 'gzip':
+            data = json.loads(gzip.decompress(request.get_data()))
+        else:
+            data = request.get_json()
 
         record = {
             "patient_id": data.get('patient_id'),
@@ -183,7 +222,7 @@ def save():
             "transcript": data.get('transcript'),
             "translation": data.get('translation'),
             "summary_data": data.get('summary_data'),
-            "timestamp": datetime.utcnow(),
+            "timestamp": datetime.now(timezone.utc),
             "tests": {}  # Initialize empty tests dict
         }
 
@@ -209,10 +248,14 @@ def get_records(patient_id):
 
 @app.route('/recordings/<path:filename>', methods=['GET'])
 def serve_recording(filename):
-    file_path = os.path.join('recordings', filename)
-    if os.path.exists(file_path):
-        return send_file(file_path)
-    return jsonify({"error": "File not found"}), 404
+    # send_from_directory with conditional=True gives us Range /
+    # If-Modified-Since support, and with USE_X_SENDFILE the front
+    # server can ship the bytes without tying up a worker
+    try:
+        return send_from_directory('recordings', filename,
+                                   conditional=True, max_age=3600)
+    except Exception:
+        return jsonify({"error": "File not found"}), 404
 
 
 # -------------------- NEW API ROUTES --------------------
@@ -221,25 +264,36 @@ def serve_recording(filename):
 def api_start_recording():
     """Start recording in control mode"""
     try:
-        if recording_state["is_recording"]:
-            return jsonify({"success": False, "message": "Already recording"}), 400
-        
-        # Initialize PyAudio
-        p = pyaudio.PyAudio()
-        stream = p.open(
+        # PortAudio's callback thread appends chunks as they arrive, so
+        # capture runs for the whole session and the Flask workers never
+        # touch the device until stop
+        audio_chunks = []
+
+        def _capture(in_data, frame_count, time_info, status):
+            audio_chunks.append(in_data)
+            return (None, pyaudio.paContinue)
+
+        stream = _PA.open(
             format=pyaudio.paInt16,
             channels=1,
             rate=44100,
             input=True,
-            frames_per_buffer=1024
+            frames_per_buffer=1024,
+            stream_callback=_capture
         )
-        
-        recording_state["is_recording"] = True
-        recording_state["audio_chunks"] = []
-        recording_state["stream"] = stream
-        recording_state["p"] = p
-        
-        return jsonify({"success": True, "message": "Recording started"})
+
+        session_id = secrets.token_hex(8)
+        with _sessions_lock:
+            _sessions[session_id] = {
+                "audio_chunks": audio_chunks,
+                "stream": stream
+            }
+
+        return jsonify({
+            "success": True,
+            "message": "Recording started",
+            "session_id": session_id
+        })
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
@@ -248,39 +302,32 @@ def api_start_recording():
 def api_stop_recording():
     """Stop recording and save file"""
     try:
-        if not recording_state["is_recording"]:
+        body = request.get_json(silent=True) or {}
+        session_id = body.get('session_id')
+
+        with _sessions_lock:
+            session = _sessions.pop(session_id, None)
+
+        if session is None:
             return jsonify({"success": False, "message": "Not recording"}), 400
-        
-        # Stop stream
-        stream = recording_state["stream"]
-        p = recording_state["p"]
-        
-        # Read remaining data
-        while stream.is_active():
-            data = stream.read(1024, exception_on_overflow=False)
-            recording_state["audio_chunks"].append(data)
-        
+
+        # The callback has been collecting chunks all along - stopping
+        # is just flipping the stream off, no drain loop on this thread
+        stream = session["stream"]
         stream.stop_stream()
         stream.close()
-        p.terminate()
-        
+
         # Save to file
         filename = f"recordings/recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"
         os.makedirs(os.path.dirname(filename), exist_ok=True)
-        
-        wf = wave.open(filename, 'wb')
-        wf.setnchannels(1)
-        wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-        wf.setframerate(44100)
-        wf.writeframes(b''.join(recording_state["audio_chunks"]))
-        wf.close()
-        
-        # Reset state
-        recording_state["is_recording"] = False
-        recording_state["audio_chunks"] = []
-        recording_state["stream"] = None
-        recording_state["p"] = None
-        
+
+        # Single numpy concatenate instead of b''.join over thousands of chunks
+        audio = np.concatenate([
+            np.frombuffer(chunk, dtype=np.int16)
+            for chunk in session["audio_chunks"]
+        ]) if session["audio_chunks"] else np.empty(0, dtype=np.int16)
+        write(filename, 44100, audio)
+
         return jsonify({"success": True, "recording_file": filename})
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
@@ -380,16 +427,26 @@ def api_get_all_patients():
 def api_get_patient_records(patient_id):
     """Get records for a specific patient"""
     try:
-        records = list(records_col.find(
-            {"patient_id": patient_id},
-            {"_id": 0}
-        ).sort("timestamp", -1))
-        
-        # Format timestamps and extract data
+        # ?fields=summary drops the bulky transcript/translation text from
+        # the query - the list view only renders condition/date, so there
+        # is no point shipping kilobytes of transcript per record
+        projection = {"_id": 0}
+        if request.args.get('fields') == 'summary':
+            projection.update({"transcript": 0, "translation": 0})
+
+        # Format the timestamp server-side with $dateToString - one pass
+        # in Mongo instead of a Python strftime per record
+        records = list(records_col.aggregate([
+            {"$match": {"patient_id": patient_id}},
+            {"$sort": {"timestamp": -1}},
+            {"$addFields": {"timestamp": {"$dateToString": {
+                "format": "%Y-%m-%d %H:%M:%S", "date": "$timestamp"
+            }}}},
+            {"$project": projection}
+        ]))
+
+        # Extract data
         for record in records:
-            if 'timestamp' in record:
-                record['timestamp'] = record['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
-            
             # Extract summary fields
             if 'summary_data' in record:
                 record['medical_condition'] = record['summary_data'].get('medical_condition', 'N/A')
@@ -425,26 +482,21 @@ def api_update_test():
         test_name = data.get('test_name')
         status = data.get('status')
         
-        # Find the specific record
-        records = list(records_col.find(
-            {"patient_id": patient_id}
-        ).sort("timestamp", -1))
+        # Resolve the index to an _id without pulling every record's
+        # transcript blobs over the wire
+        target = list(records_col.find(
+            {"patient_id": patient_id},
+            {"_id": 1}
+        ).sort("timestamp", -1).skip(record_index).limit(1))
         
-        if record_index >= len(records):
+        if not target:
             return jsonify({"success": False, "message": "Invalid record index"}), 400
         
-        record = records[record_index]
-        
-        # Update tests
-        if 'tests' not in record:
-            record['tests'] = {}
-        
-        record['tests'][test_name] = status
-        
-        # Update in database
+        # Dotted path sets just the one test - no read-modify-write of
+        # the whole tests sub-document
         records_col.update_one(
-            {"_id": record["_id"]},
-            {"$set": {"tests": record['tests']}}
+            {"_id": target[0]["_id"]},
+            {"$set": {f"tests.{test_name}": status}}
         )
         
         return jsonify({"success": True, "message": "Test updated successfully"})
@@ -454,4 +506,12 @@ def api_update_test():
 
 # -------------------- RUN --------------------
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # The Werkzeug debug server serializes requests and its reloader
+    # throws away the module-level PyAudio/Mongo singletons on every
+    # file touch - serve through waitress with a thread pool instead.
+    # Equivalent: gunicorn -k gthread --threads 16 --workers 2 flaskapp4:app
+    try:
+        from waitress import serve
+        serve(app, host='0.0.0.0', port=5000, threads=16)
+    except ImportError:
+        app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,45 @@
+// Waveform worker: turns a recording's WAV bytes into ~2000 max-abs
+// peaks for the canvas preview, entirely off the main thread.
+// decodeAudioData isn't available in worker scope, but the server only
+// ever produces 16-bit PCM WAV, so the samples are read directly.
+const PEAK_COUNT = 2000;
+
+function findDataChunk(view) {
+    // Walk the RIFF chunks; 'data' isn't always at a fixed offset
+    let offset = 12;
+    while (offset + 8 <= view.byteLength) {
+        const id = String.fromCharCode(
+            view.getUint8(offset), view.getUint8(offset + 1),
+            view.getUint8(offset + 2), view.getUint8(offset + 3));
+        const size = view.getUint32(offset + 4, true);
+        if (id === 'data') return { start: offset + 8, size };
+        offset += 8 + size + (size & 1);
+    }
+    return null;
+}
+
+self.onmessage = (e) => {
+    const view = new DataView(e.data);
+    const data = findDataChunk(view);
+    if (!data) {
+        self.postMessage(null);
+        return;
+    }
+
+    const samples = new Int16Array(e.data, data.start, Math.floor(data.size / 2));
+    const peaks = new Float32Array(PEAK_COUNT);
+    const stride = Math.max(1, Math.floor(samples.length / PEAK_COUNT));
+
+    for (let p = 0; p < PEAK_COUNT; p++) {
+        let max = 0;
+        const start = p * stride;
+        const end = Math.min(start + stride, samples.length);
+        for (let i = start; i < end; i++) {
+            const abs = samples[i] < 0 ? -samples[i] : samples[i];
+            if (abs > max) max = abs;
+        }
+        peaks[p] = max / 32768;
+    }
+
+    self.postMessage(peaks.buffer, [peaks.buffer]);
+};
@@ -0,0 +1,48 @@
+// PCM capture processor: runs on the audio rendering thread so the
+// float->int16 conversion and batching never touch the main thread.
+// Batches ~500ms of samples and transfers the buffer to the page
+// (ownership handoff, no copy).
+const BATCH_SAMPLES = 8000; // 500ms at 16kHz
+
+class PcmCaptureProcessor extends AudioWorkletProcessor {
+    constructor() {
+        super();
+        this.chunks = [];
+        this.samples = 0;
+        this.peak = 0;
+    }
+
+    process(inputs) {
+        const input = inputs[0][0];
+        if (!input) return true;
+
+        const pcm = new Int16Array(input.length);
+        for (let i = 0; i < input.length; i++) {
+            const s = input[i];
+            // peak tracked online, one compare per sample - no analysis
+            // pass over the full recording afterwards
+            const abs = s < 0 ? -s : s;
+            if (abs > this.peak) this.peak = abs;
+            pcm[i] = Math.max(-32768, Math.min(32767, s * 32768));
+        }
+        this.chunks.push(pcm);
+        this.samples += pcm.length;
+
+        if (this.samples >= BATCH_SAMPLES) {
+            const combined = new Int16Array(this.samples);
+            let offset = 0;
+            for (const chunk of this.chunks) {
+                combined.set(chunk, offset);
+                offset += chunk.length;
+            }
+            this.port.postMessage(
+                { buf: combined.buffer, peak: this.peak }, [combined.buffer]);
+            this.chunks = [];
+            this.samples = 0;
+            this.peak = 0;
+        }
+        return true;
+    }
+}
+
+registerProcessor('pcm-capture', PcmCaptureProcessor);